@@ -1,22 +1,35 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 
+try:
+    import ijson
+except ImportError:  # fall back to decoding the whole body at once
+    ijson = None
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder/decoder
+    orjson = None
+
 # Configuration
 API_BASE_URL = "https://api.nlpbusiness.site"  # Your FastAPI server base URL (without /docs)
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) timeouts in seconds
+JSON_HEADERS = {"Content-Type": "application/json"}
+CHAPTER_LIST_FIELDS = ("chapter_id", "chapter_title", "created_at")  # Kept from /api/all-chapters
+PREFETCH_CHAPTER_DETAILS = 10  # Chapters whose details are warmed on first load
 
-# Page configuration
-st.set_page_config(
-    page_title="Syllabus Management System",
-    page_icon="📚",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
 
-# Custom CSS for better styling
-st.markdown("""
+CSS = """
 <style>
     .main-header {
         font-size: 2.5rem;
@@ -54,27 +67,140 @@ st.markdown("""
         box-shadow: 0 2px 10px rgba(0,0,0,0.1);
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+# Page configuration
+st.set_page_config(
+    page_title="Syllabus Management System",
+    page_icon="📚",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Custom CSS for better styling. This has to be emitted on every run:
+# Streamlit removes elements that a rerun does not render again.
+st.markdown(CSS, unsafe_allow_html=True)
+
+@st.cache_resource
+def get_adapter():
+    """Shared connection pool so keep-alive connections survive reruns and users"""
+    return HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=20,
+        # Only idempotent methods are retried, and only on gateway errors,
+        # never on 4xx responses
+        max_retries=Retry(
+            total=3,
+            connect=3,
+            read=2,
+            backoff_factor=0.3,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(["GET", "PUT"])
+        )
+    )
+
+@st.cache_resource
+def get_write_once_adapter():
+    """Connection pool for writes that must never be replayed"""
+    # Only failed connects are retried: the request never reached the
+    # server then. Read errors and gateway statuses are returned as-is.
+    return HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=4,
+        max_retries=Retry(total=3, connect=3, read=0, status=0, backoff_factor=0.3)
+    )
+
+def get_user_session(key, adapter):
+    """Per-user HTTP session stored under key, mounted on the given pool"""
+    # Kept per user so the Authorization header never leaks between users
+    if key not in st.session_state:
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        st.session_state[key] = session
+    return st.session_state[key]
+
+def get_session():
+    """HTTP session of the current user, backed by the shared connection pool"""
+    return get_user_session("http", get_adapter())
+
+def get_write_once_session():
+    """HTTP session of the current user for writes that must never be replayed"""
+    return get_user_session("http_write_once", get_write_once_adapter())
+
+def set_session_auth(token):
+    """Attach the bearer token to the current user's sessions, or remove it"""
+    for session in (get_session(), get_write_once_session()):
+        if token:
+            session.headers["Authorization"] = f"Bearer {token}"
+        else:
+            session.headers.pop("Authorization", None)
+
+def api_request(method, path, replayable=True, **kwargs):
+    """Send a request to the API through the shared session, with default timeouts"""
+    timeout = kwargs.pop("timeout", REQUEST_TIMEOUT)
+    # Non-idempotent writes go through a session without the retrying
+    # adapter, so a lost response can't make them apply twice
+    session = get_session() if replayable else get_write_once_session()
+    return session.request(method, f"{API_BASE_URL}{path}", timeout=timeout, **kwargs)
+
+def decode_json(response):
+    """Decode a JSON response body, with orjson when available"""
+    if orjson is None:
+        return response.json()
+    return orjson.loads(response.content)
+
+def encode_json(payload, sort_keys=False):
+    """Encode a JSON request body, with orjson when available"""
+    if orjson is None:
+        return json.dumps(payload, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+
+def read_list_response(response, fields):
+    """Decode a streamed API response whose data is a list, keeping only fields of each item"""
+    if ijson is None:
+        envelope = decode_json(response)
+        envelope["data"] = [{field: item.get(field) for field in fields} for item in envelope.get("data") or []]
+        return envelope
+    response.raw.decode_content = True
+    envelope = {"data": []}
+    item_prefixes = {f"data.item.{field}": field for field in fields}
+    # Walk the parse events so only the wanted scalar fields of each item
+    # are ever kept, while still picking up the top-level succeeded/message
+    for prefix, event, value in ijson.parse(response.raw, use_float=True):
+        if prefix in ("succeeded", "message"):
+            envelope[prefix] = value
+        elif prefix == "data.item" and event == "start_map":
+            envelope["data"].append(dict.fromkeys(fields))
+        elif prefix in item_prefixes and event in ("string", "number", "boolean", "null"):
+            envelope["data"][-1][item_prefixes[prefix]] = value
+    return envelope
+
+def debug_info(message):
+    """Log a diagnostic message, and show it in the UI when debug mode is on"""
+    logger.debug(message)
+    if st.session_state.get("debug"):
+        st.info(message)
 
 def login_user(email, password):
     """Login user and return token"""
     try:
         # Based on main.py, all endpoints are under /api prefix
-        login_endpoint = f"{API_BASE_URL}/api/login"
+        login_endpoint = "/api/login"
         
-        st.info(f"Trying login endpoint: {login_endpoint}")
+        debug_info(f"Trying login endpoint: {API_BASE_URL}{login_endpoint}")
         
-        response = requests.post(
+        response = api_request(
+            "POST",
             login_endpoint,
-            json={"email": email, "password": password},
-            timeout=10
+            data=encode_json({"email": email, "password": password}),
+            headers=JSON_HEADERS
         )
         
-        st.info(f"Response status: {response.status_code}")
-        st.info(f"Response content: {response.text[:200]}...")
+        debug_info(f"Response status: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
+            data = decode_json(response)
             if data.get("succeeded"):
                 return data["data"]["token"], data["data"]["username"], data["data"]["user_role"]
             else:
@@ -88,74 +214,91 @@ def login_user(email, password):
         st.error(f"Login error: {str(e)}")
         return None, None, None
 
+@st.cache_data(ttl=60, show_spinner=False, max_entries=128)
+def fetch_all_chapters(token):
+    """Fetch all chapters from API, raising on failure so errors are not cached"""
+    # The session carries the Authorization header; token only scopes the
+    # cache per user.
+    with api_request("GET", "/api/all-chapters", stream=True) as response:
+        if response.status_code != 200:
+            raise ValueError(f"request failed with status {response.status_code}")
+        # Only keep what the list views use; full chapters come from /api/syllabus
+        data = read_list_response(response, CHAPTER_LIST_FIELDS)
+    if not data.get("succeeded"):
+        raise ValueError(data.get("message", "Unknown error"))
+    return data["data"]
+
 def get_all_chapters(token):
     """Get all chapters from API"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_BASE_URL}/api/all-chapters", headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("succeeded"):
-                return data["data"]
-        return []
+        return fetch_all_chapters(token)
     except Exception as e:
         st.error(f"Error fetching chapters: {str(e)}")
         return []
 
+@st.cache_data(ttl=60, show_spinner=False, max_entries=128)
+def fetch_chapter_details(chapter_id, token):
+    """Fetch specific chapter details, raising on failure so errors are not cached"""
+    with api_request("GET", f"/api/syllabus/{chapter_id}", stream=True) as response:
+        if response.status_code != 200:
+            raise ValueError(f"request failed with status {response.status_code}")
+        data = decode_json(response)
+    if not data.get("succeeded"):
+        raise ValueError(data.get("message", "Unknown error"))
+    return data["data"]
+
 def get_chapter_details(chapter_id, token):
     """Get specific chapter details"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.get(f"{API_BASE_URL}/api/syllabus/{chapter_id}", headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("succeeded"):
-                return data["data"]
-        return None
+        return fetch_chapter_details(chapter_id, token)
     except Exception as e:
         st.error(f"Error fetching chapter details: {str(e)}")
         return None
 
-def update_chapter(chapter_id, chapter_data, token):
+def update_chapter(chapter_id, chapter_data):
     """Update or create chapter"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        response = requests.put(f"{API_BASE_URL}/api/syllabus/{chapter_id}", 
-                              json=chapter_data, headers=headers)
+        response = api_request("PUT", f"/api/syllabus/{chapter_id}",
+                               data=encode_json(chapter_data), headers=JSON_HEADERS)
         if response.status_code in [200, 201]:
-            data = response.json()
+            data = decode_json(response)
             if data.get("succeeded"):
+                # Drop cached reads so the next render sees the saved chapter
+                fetch_all_chapters.clear()
+                fetch_chapter_details.clear()
                 return True, data["message"]
         return False, "Update failed"
     except Exception as e:
         return False, f"Error: {str(e)}"
 
+@st.cache_data(ttl=60, show_spinner=False, max_entries=128)
+def fetch_mcqs_for_chapter(chapter_id, token):
+    """Fetch all MCQs for a specific chapter, raising on failure so errors are not cached"""
+    # Use the correct endpoint for getting MCQs
+    mcq_endpoint = f"/api/mcqs/{chapter_id}"
+    response = api_request("GET", mcq_endpoint)
+    
+    # A missing or unsuccessful MCQ set is a real "no MCQs" answer
+    if response.status_code == 404:
+        return []
+    if response.status_code != 200:
+        raise ValueError(f"request failed with status {response.status_code}")
+    data = decode_json(response)
+    if data.get("succeeded"):
+        return data["data"]
+    return []
+
 def get_mcqs_for_chapter(chapter_id, token):
-    """Get all MCQs for a specific chapter"""
+    """Get all MCQs for a specific chapter, or None if they could not be fetched"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        
-        # Use the correct endpoint for getting MCQs
-        mcq_endpoint = f"{API_BASE_URL}/api/mcqs/{chapter_id}"
-        st.info(f"Fetching MCQs from: {mcq_endpoint}")
-        
-        response = requests.get(mcq_endpoint, headers=headers)
-        st.info(f"MCQ API Response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("succeeded"):
-                return data["data"]
-        return []
+        return fetch_mcqs_for_chapter(chapter_id, token)
     except Exception as e:
         st.error(f"Error fetching MCQs: {str(e)}")
-        return []
+        return None
 
-def create_test_mcqs(chapter_id, token):
+def create_test_mcqs(chapter_id):
     """Create some test MCQs for a chapter"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        
         # Sample test MCQs
         test_mcqs = [
             {
@@ -182,26 +325,28 @@ def create_test_mcqs(chapter_id, token):
             }
         ]
         
-        response = requests.put(
-            f"{API_BASE_URL}/api/mcqs/{chapter_id}",
-            json=test_mcqs,
-            headers=headers
+        response = api_request(
+            "PUT",
+            f"/api/mcqs/{chapter_id}",
+            data=encode_json(test_mcqs),
+            headers=JSON_HEADERS,
+            # These MCQs carry no ids, so every PUT creates new records
+            replayable=False
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = decode_json(response)
             if data.get("succeeded"):
+                fetch_mcqs_for_chapter.clear()
                 return True, f"Created {len(test_mcqs)} test MCQs successfully!"
         return False, "Failed to create test MCQs"
         
     except Exception as e:
         return False, f"Error creating test MCQs: {str(e)}"
 
-def update_mcq(mcq_id, chapter_id, mcq_data, token):
+def update_mcq(mcq_id, chapter_id, mcq_data):
     """Update a specific MCQ"""
     try:
-        headers = {"Authorization": f"Bearer {token}"}
-        
         # Prepare the MCQ data for update - include the MCQ ID
         update_data = [{
             "id": mcq_id,
@@ -211,21 +356,292 @@ def update_mcq(mcq_id, chapter_id, mcq_data, token):
             "explanation": mcq_data.get("explanation", "")
         }]
         
-        response = requests.put(
-            f"{API_BASE_URL}/api/mcqs/{chapter_id}",
-            json=update_data,
-            headers=headers
+        response = api_request(
+            "PUT",
+            f"/api/mcqs/{chapter_id}",
+            data=encode_json(update_data),
+            headers=JSON_HEADERS
         )
         
         if response.status_code == 200:
-            data = response.json()
+            data = decode_json(response)
             if data.get("succeeded"):
+                fetch_mcqs_for_chapter.clear()
                 return True, "MCQ updated successfully!"
         return False, "Failed to update MCQ"
         
     except Exception as e:
         return False, f"Error updating MCQ: {str(e)}"
 
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_chapters_df(chapters_key):
+    """Build the chapters table, once per distinct chapter list"""
+    df = pd.DataFrame(json.loads(chapters_key))
+    df['created_at'] = pd.to_datetime(df['created_at'], format="ISO8601", cache=True).dt.strftime('%Y-%m-%d %H:%M')
+    return df
+
+def text_to_list(text):
+    """Convert a multi-line text area value to a list of non-empty lines"""
+    return [line for line in (raw.strip() for raw in text.splitlines()) if line]
+
+def batch_fetch(calls):
+    """Run independent API reads concurrently and return results in call order"""
+    (first_fn, first_args), *rest = calls
+    
+    # Pool threads are shared between sessions, so each task attaches this
+    # run's script context itself; st.error calls then still render
+    ctx = get_script_run_ctx()
+    
+    def run(fn, args):
+        add_script_run_ctx(None, ctx)
+        return fn(*args)
+    
+    futures = [get_prefetch_executor().submit(run, fn, args) for fn, args in rest]
+    # The first call runs on the script thread rather than waiting for a free worker
+    return [first_fn(*first_args)] + [future.result() for future in futures]
+
+def prefetch(fetcher, *args):
+    """Warm a cached fetcher, logging failures instead of showing them"""
+    # Whoever later reads the data retries the fetch and reports the error
+    try:
+        fetcher(*args)
+    except Exception as e:
+        logger.debug(f"Prefetch with {fetcher.__name__} failed: {e}")
+
+@st.cache_resource
+def get_prefetch_executor():
+    """Shared worker pool for batched reads and background cache warm-ups"""
+    return ThreadPoolExecutor(max_workers=8)
+
+def prefetch_in_background(fetcher, *args):
+    """Warm a cached fetcher on the background pool without blocking the run"""
+    # The worker needs this session's script context to reach its HTTP session
+    ctx = get_script_run_ctx()
+    
+    def run():
+        add_script_run_ctx(None, ctx)
+        prefetch(fetcher, *args)
+    
+    get_prefetch_executor().submit(run)
+
+def load_dashboard(token, chapter_id=None, mcq_chapter_id=None):
+    """Get the chapter list, prefetching the selected chapter details and MCQs alongside"""
+    # The editors read through the cached getters, so warming them in the
+    # same fan-out turns those reads into cache hits
+    calls = [(get_all_chapters, (token,))]
+    if chapter_id:
+        calls.append((prefetch, (fetch_chapter_details, chapter_id, token)))
+    if mcq_chapter_id:
+        calls.append((prefetch, (fetch_mcqs_for_chapter, mcq_chapter_id, token)))
+    return batch_fetch(calls)[0]
+
+# Key point text areas shared by the edit and create chapter forms:
+# (heading, field, label, placeholder, help), laid out two per column
+KEY_POINT_SECTIONS = [
+    ("🔑 Important Things", "important_things", "Important concepts, facts, or points (one per line)",
+     "• Key concept 1\n• Key concept 2\n• Key concept 3", "List important things to remember, one per line"),
+    ("💡 Key Learnings", "key_learnings", "Main learning objectives (one per line)",
+     "• Learning objective 1\n• Learning objective 2\n• Learning objective 3",
+     "List what students should learn from this chapter, one per line"),
+    ("🏃 Exercises & Activities", "exercises_activities", "Practical exercises and activities (one per line)",
+     "• Exercise 1\n• Exercise 2\n• Activity 1", "List exercises and activities for students, one per line"),
+    ("💬 Inspirational Quotes", "quotes", "Motivational or relevant quotes (one per line)",
+     "• \"Quote 1\"\n• \"Quote 2\"\n• \"Quote 3\"", "Add motivational quotes related to the chapter, one per line"),
+]
+
+def render_chapter_fields(chapter_details=None):
+    """Render the chapter fields shared by the edit and create forms and return their values"""
+    chapter_details = chapter_details or {}
+    fields = {}
+    
+    st.markdown("---")
+    
+    # Summary Section
+    st.subheader("📝 Summary")
+    fields["summary"] = st.text_area("Chapter Summary", value=chapter_details.get('summary', ''), 
+                                     height=120, placeholder="Enter a comprehensive summary of the chapter...",
+                                     help="Provide a clear and concise summary of the chapter content")
+    
+    st.markdown("---")
+    
+    # Chapter Text Section
+    st.subheader("📚 Chapter Content")
+    fields["chapter_text"] = st.text_area("Full Chapter Text", value=chapter_details.get('chapter_text', ''), 
+                                          height=200, placeholder="Enter the complete chapter content...",
+                                          help="Include all the detailed content for this chapter")
+    
+    st.markdown("---")
+    
+    # Key Points Section (Two Columns)
+    st.subheader("🎯 Key Points")
+    columns = st.columns(2)
+    
+    for i, (heading, field, label, placeholder, help_text) in enumerate(KEY_POINT_SECTIONS):
+        with columns[i // 2]:
+            st.markdown(f"**{heading}**")
+            value = '\n'.join(chapter_details.get(field, []))
+            text = st.text_area(label, value=value, height=120, placeholder=placeholder, help=help_text)
+            fields[field] = text_to_list(text)
+    
+    return fields
+
+# st.fragment is only available on newer Streamlit releases
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", lambda func: func)
+
+@fragment
+def chapter_editor(selected_chapter_id):
+    """Edit form for one chapter, rerun on its own when submitted"""
+    chapter_details = get_chapter_details(selected_chapter_id, st.session_state.token)
+    
+    if chapter_details:
+        with st.form(f"edit_chapter_{selected_chapter_id}"):
+            st.write(f"**Editing Chapter {selected_chapter_id}**")
+            
+            col1, col2 = st.columns(2)
+            
+            # Chapter Title and Summary (Full Width)
+            chapter_title = st.text_input("📖 Chapter Title", value=chapter_details.get('chapter_title', ''), 
+                                        help="Enter the title of the chapter")
+            
+            fields = render_chapter_fields(chapter_details)
+            
+            submit_edit = st.form_submit_button("Update Chapter")
+            
+            if submit_edit:
+                chapter_data = {"chapter_title": chapter_title, **fields}
+                
+                # Skip the PUT when nothing differs from the loaded chapter,
+                # which is re-fetched after every successful save
+                if all(chapter_details.get(field) == value for field, value in chapter_data.items()):
+                    st.info("No changes to save")
+                else:
+                    success, message = update_chapter(selected_chapter_id, chapter_data)
+                    
+                    if success:
+                        # Caches are already cleared, so the next
+                        # interaction picks up the saved chapter
+                        st.toast(message)
+                    else:
+                        st.error(message)
+
+@fragment
+def mcq_editor(selected_mcq_chapter_id):
+    """MCQ actions and edit forms for one chapter, rerun on their own"""
+    # Action buttons
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        st.write("**Actions:**")
+    with col2:
+        if st.button("➕ Create Test MCQs", key=f"create_test_mcqs_{selected_mcq_chapter_id}"):
+            with st.spinner("Creating test MCQs..."):
+                success, message = create_test_mcqs(selected_mcq_chapter_id)
+                if success:
+                    st.toast(message)
+                else:
+                    st.error(message)
+    with col3:
+        if st.button("🔄 Refresh MCQs", key=f"refresh_mcqs_{selected_mcq_chapter_id}"):
+            fetch_mcqs_for_chapter.clear()
+    
+    # Fetch and display MCQs
+    with st.spinner("Loading MCQs..."):
+        mcqs = get_mcqs_for_chapter(selected_mcq_chapter_id, st.session_state.token)
+    
+    if mcqs:
+        st.success(f"Found {len(mcqs)} MCQ(s) for Chapter {selected_mcq_chapter_id}")
+        
+        # Display existing MCQs
+        st.markdown("---")
+        st.subheader("📝 MCQs")
+        
+        for i, mcq in enumerate(mcqs, 1):
+            with st.expander(f"MCQ {i}: {mcq['question'][:80]}...", expanded=False):
+                # Display current MCQ data
+                st.write(f"**Question:** {mcq['question']}")
+                st.write(f"**Options:**")
+                for j, option in enumerate(mcq['options'], 1):
+                    if option == mcq.get('correct_answer'):
+                        st.write(f"  {j}. {option} ✅ (Correct)")
+                    else:
+                        st.write(f"  {j}. {option}")
+                
+                if mcq.get('explanation'):
+                    st.write(f"**Explanation:** {mcq['explanation']}")
+                st.write(f"**Created:** {mcq.get('created_at', 'N/A')}")
+                
+                # Edit MCQ section
+                st.markdown("---")
+                st.subheader("✏️ Edit MCQ")
+                
+                with st.form(f"edit_mcq_{mcq.get('id', i)}"):
+                    # Question
+                    edited_question = st.text_area(
+                        "Question",
+                        value=mcq['question'],
+                        height=100,
+                        key=f"question_{mcq.get('id', i)}"
+                    )
+                    
+                    # Options
+                    st.write("**Options:**")
+                    edited_options = []
+                    for j, option in enumerate(mcq['options']):
+                        edited_option = st.text_input(
+                            f"Option {j+1}",
+                            value=option,
+                            key=f"option_{mcq.get('id', i)}_{j}"
+                        )
+                        edited_options.append(edited_option)
+                    
+                    # Correct Answer
+                    correct_answer_key = mcq.get('correct_answer', '')
+                    correct_answer_index = 0
+                    if correct_answer_key in mcq['options']:
+                        correct_answer_index = mcq['options'].index(correct_answer_key)
+                    
+                    correct_answer_option = st.selectbox(
+                        "Correct Answer",
+                        options=edited_options if all(edited_options) else ["Please fill all options first"],
+                        index=correct_answer_index,
+                        key=f"correct_{mcq.get('id', i)}"
+                    )
+                    
+                    # Explanation
+                    edited_explanation = st.text_area(
+                        "Explanation (optional)",
+                        value=mcq.get('explanation', ''),
+                        height=80,
+                        key=f"explanation_{mcq.get('id', i)}"
+                    )
+                    
+                    # Update button
+                    update_button = st.form_submit_button("Update MCQ")
+                    
+                    if update_button:
+                        if edited_question and all(edited_options) and correct_answer_option != "Please fill all options first":
+                            mcq_data = {
+                                "question": edited_question,
+                                "options": edited_options,
+                                "correct_answer": correct_answer_option,
+                                "explanation": edited_explanation
+                            }
+                            
+                            success, message = update_mcq(
+                                mcq.get('id'), 
+                                selected_mcq_chapter_id, 
+                                mcq_data
+                            )
+                            
+                            if success:
+                                st.toast(message)
+                            else:
+                                st.error(message)
+                        else:
+                            st.error("Please fill in all required fields (question and all options).")
+    elif mcqs is not None:
+        # None means the fetch failed and already showed its error
+        st.info("No MCQs found for this chapter. Use the 'Create Test MCQs' button to add sample questions.")
+
 
 
 def main():
@@ -249,11 +665,15 @@ def main():
             
             if st.button("Logout"):
                 st.session_state.token = None
+                st.session_state.details_prefetched = False
+                set_session_auth(None)
                 st.session_state.username = None
                 st.session_state.user_role = None
                 st.rerun()
         else:
             st.warning("Please login to continue")
+        
+        st.checkbox("Debug", key="debug", help="Show API diagnostics")
 
     # Main content
     if not st.session_state.token:
@@ -270,6 +690,7 @@ def main():
                 
                 if token_submit and direct_token:
                     st.session_state.token = direct_token
+                    set_session_auth(direct_token)
                     st.session_state.username = "Direct Access"
                     st.session_state.user_role = "Admin"
                     st.success("Token access granted!")
@@ -287,6 +708,7 @@ def main():
                     token, username, user_role = login_user(email, password)
                     if token:
                         st.session_state.token = token
+                        set_session_auth(token)
                         st.session_state.username = username
                         st.session_state.user_role = user_role
                         st.success("Login successful!")
@@ -301,124 +723,45 @@ def main():
         # Main dashboard with tabs
         tab1, tab2 = st.tabs(["📖 Chapter Management", "📝 MCQs"])
         
+        # Fetch everything both tabs need in one go, using the chapters
+        # selected on the previous run, so the editors below hit the cache
+        prefetched_chapter_id = st.session_state.get("chapter_selector")
+        prefetched_mcq_chapter_id = st.session_state.get("mcq_chapter_selector")
+        chapters = load_dashboard(st.session_state.token, prefetched_chapter_id, prefetched_mcq_chapter_id)
+        chapter_by_id = {c['chapter_id']: c for c in chapters}
+        chapter_ids = list(chapter_by_id)
+        title_by_id = {chapter_id: c['chapter_title'] for chapter_id, c in chapter_by_id.items()}
+        
+        # Warm the details cache for the first chapters once per login, in the
+        # background, so picking one of them in the editor doesn't wait on the
+        # API. The chapter the editor opens right away is left to the editor.
+        if chapters and not st.session_state.get("details_prefetched"):
+            opened_chapter_id = prefetched_chapter_id or chapter_ids[0]
+            for chapter_id in chapter_ids[:PREFETCH_CHAPTER_DETAILS]:
+                if chapter_id != opened_chapter_id:
+                    prefetch_in_background(fetch_chapter_details, chapter_id, st.session_state.token)
+            st.session_state.details_prefetched = True
+        
         with tab1:
             st.header("📖 Chapter Management")
             
-            # Get all chapters
-            chapters = get_all_chapters(st.session_state.token)
-            
             if chapters:
                 # Display chapters in a table
                 st.subheader("📋 All Chapters")
-                df = pd.DataFrame(chapters)
-                df['created_at'] = pd.to_datetime(df['created_at']).dt.strftime('%Y-%m-%d %H:%M')
+                df = build_chapters_df(encode_json(chapters, sort_keys=True))
                 st.dataframe(df, use_container_width=True)
                 
                 # Chapter selection for editing
                 st.subheader("✏️ Edit Chapter")
-                chapter_ids = [chapter['chapter_id'] for chapter in chapters]
                 selected_chapter_id = st.selectbox(
                     "📚 Select Chapter",
                     chapter_ids,
-                    format_func=lambda x: f"Chapter {x}: {next((c['chapter_title'] for c in chapters if c['chapter_id'] == x), '')}"
+                    format_func=lambda x: f"Chapter {x}: {title_by_id.get(x, '')}",
+                    key="chapter_selector"
                 )
                 
                 if selected_chapter_id:
-                    # Get chapter details
-                    chapter_details = get_chapter_details(selected_chapter_id, st.session_state.token)
-                    
-                    if chapter_details:
-                        with st.form(f"edit_chapter_{selected_chapter_id}"):
-                            st.write(f"**Editing Chapter {selected_chapter_id}**")
-                            
-                            col1, col2 = st.columns(2)
-                            
-                            # Chapter Title and Summary (Full Width)
-                            chapter_title = st.text_input("📖 Chapter Title", value=chapter_details.get('chapter_title', ''), 
-                                                        help="Enter the title of the chapter")
-                            
-                            st.markdown("---")
-                            
-                            # Summary Section
-                            st.subheader("📝 Summary")
-                            summary = st.text_area("Chapter Summary", value=chapter_details.get('summary', ''), 
-                                                 height=120, placeholder="Enter a comprehensive summary of the chapter...",
-                                                 help="Provide a clear and concise summary of the chapter content")
-                            
-                            st.markdown("---")
-                            
-                            # Chapter Text Section
-                            st.subheader("📚 Chapter Content")
-                            chapter_text = st.text_area("Full Chapter Text", value=chapter_details.get('chapter_text', ''), 
-                                                      height=200, placeholder="Enter the complete chapter content...",
-                                                      help="Include all the detailed content for this chapter")
-                            
-                            st.markdown("---")
-                            
-                            # Key Points Section (Two Columns)
-                            st.subheader("🎯 Key Points")
-                            col1, col2 = st.columns(2)
-                            
-                            with col1:
-                                st.markdown("**🔑 Important Things**")
-                                important_things = st.text_area(
-                                    "Important concepts, facts, or points (one per line)", 
-                                    value='\n'.join(chapter_details.get('important_things', [])),
-                                    height=120, placeholder="• Key concept 1\n• Key concept 2\n• Key concept 3",
-                                    help="List important things to remember, one per line"
-                                )
-                                
-                                st.markdown("**💡 Key Learnings**")
-                                key_learnings = st.text_area(
-                                    "Main learning objectives (one per line)", 
-                                    value='\n'.join(chapter_details.get('key_learnings', [])),
-                                    height=120, placeholder="• Learning objective 1\n• Learning objective 2\n• Learning objective 3",
-                                    help="List what students should learn from this chapter, one per line"
-                                )
-                            
-                            with col2:
-                                st.markdown("**🏃 Exercises & Activities**")
-                                exercises_activities = st.text_area(
-                                    "Practical exercises and activities (one per line)", 
-                                    value='\n'.join(chapter_details.get('exercises_activities', [])),
-                                    height=120, placeholder="• Exercise 1\n• Exercise 2\n• Activity 1",
-                                    help="List exercises and activities for students, one per line"
-                                )
-                                
-                                st.markdown("**💬 Inspirational Quotes**")
-                                quotes = st.text_area(
-                                    "Motivational or relevant quotes (one per line)", 
-                                    value='\n'.join(chapter_details.get('quotes', [])),
-                                    height=120, placeholder="• \"Quote 1\"\n• \"Quote 2\"\n• \"Quote 3\"",
-                                    help="Add motivational quotes related to the chapter, one per line"
-                                )
-                            
-                            # Convert text areas to lists
-                            def text_to_list(text):
-                                return [line.strip() for line in text.split('\n') if line.strip()]
-                            
-                            submit_edit = st.form_submit_button("Update Chapter")
-                            
-                            if submit_edit:
-                                chapter_data = {
-                                    "chapter_title": chapter_title,
-                                    "summary": summary,
-                                    "important_things": text_to_list(important_things),
-                                    "key_learnings": text_to_list(key_learnings),
-                                    "exercises_activities": text_to_list(exercises_activities),
-                                    "quotes": text_to_list(quotes),
-                                    "chapter_text": chapter_text
-                                }
-                                
-                                success, message = update_chapter(selected_chapter_id, chapter_data, st.session_state.token)
-                                
-                                if success:
-                                    st.success(message)
-                                    st.rerun()
-                                else:
-                                    st.error(message)
-                    else:
-                        st.error("Could not fetch chapter details")
+                    chapter_editor(selected_chapter_id)
             else:
                 st.info("No chapters found. Please add some chapters first.")
                 
@@ -435,76 +778,15 @@ def main():
                                                          placeholder="Enter chapter title",
                                                          help="Enter the title of the chapter")
                     
-                    st.markdown("---")
-                    
-                    # Summary Section
-                    st.subheader("📝 Summary")
-                    new_summary = st.text_area("Chapter Summary", height=120, 
-                                             placeholder="Enter a comprehensive summary of the chapter...",
-                                             help="Provide a clear and concise summary of the chapter content")
-                    
-                    st.markdown("---")
-                    
-                    # Chapter Text Section
-                    st.subheader("📖 Chapter Content")
-                    new_chapter_text = st.text_area("Full Chapter Text", height=200, 
-                                                  placeholder="Enter the complete chapter content...",
-                                                  help="Include all the detailed content for this chapter")
-                    
-                    st.markdown("---")
-                    
-                    # Key Points Section (Two Columns)
-                    st.subheader("🎯 Key Points")
-                    col1, col2 = st.columns(2)
-                    
-                    with col1:
-                        st.markdown("**🔑 Important Things**")
-                        new_important_things = st.text_area(
-                            "Important concepts, facts, or points (one per line)", 
-                            height=120, placeholder="• Key concept 1\n• Key concept 2\n• Key concept 3",
-                            help="List important things to remember, one per line"
-                        )
-                        
-                        st.markdown("**💡 Key Learnings**")
-                        new_key_learnings = st.text_area(
-                            "Main learning objectives (one per line)", 
-                            height=120, placeholder="• Learning objective 1\n• Learning objective 2\n• Learning objective 3",
-                            help="List what students should learn from this chapter, one per line"
-                        )
-                    
-                    with col2:
-                        st.markdown("**🏃 Exercises & Activities**")
-                        new_exercises_activities = st.text_area(
-                            "Practical exercises and activities (one per line)", 
-                            height=120, placeholder="• Exercise 1\n• Exercise 2\n• Activity 1",
-                            help="List exercises and activities for students, one per line"
-                        )
-                        
-                        st.markdown("**💬 Inspirational Quotes**")
-                        new_quotes = st.text_area(
-                            "Motivational or relevant quotes (one per line)", 
-                            height=120, placeholder="• \"Quote 1\"\n• \"Quote 2\"\n \"Quote 3\"",
-                            help="Add motivational quotes related to the chapter, one per line"
-                        )
-                    
-                    def text_to_list(text):
-                        return [line.strip() for line in text.split('\n') if line.strip()]
+                    fields = render_chapter_fields()
                     
                     create_button = st.form_submit_button("Create Chapter")
                     
                     if create_button:
                         if new_chapter_id and new_chapter_title:
-                            chapter_data = {
-                                "chapter_title": new_chapter_title,
-                                "summary": new_summary,
-                                "important_things": text_to_list(new_important_things),
-                                "key_learnings": text_to_list(new_key_learnings),
-                                "exercises_activities": text_to_list(new_exercises_activities),
-                                "quotes": text_to_list(new_quotes),
-                                "chapter_text": new_chapter_text
-                            }
+                            chapter_data = {"chapter_title": new_chapter_title, **fields}
                             
-                            success, message = update_chapter(new_chapter_id, chapter_data, st.session_state.token)
+                            success, message = update_chapter(new_chapter_id, chapter_data)
                             
                             if success:
                                 st.success(message)
@@ -517,141 +799,22 @@ def main():
         with tab2:
             st.header("📝 MCQs Management")
             
-            # Get all chapters for MCQ selection
-            chapters = get_all_chapters(st.session_state.token)
-            
             if chapters:
                 st.subheader("📚 Select Chapter to Manage MCQs")
-                chapter_ids = [chapter['chapter_id'] for chapter in chapters]
                 selected_mcq_chapter_id = st.selectbox(
                     "📚 Select Chapter",
                     chapter_ids,
-                    format_func=lambda x: f"Chapter {x}: {next((c['chapter_title'] for c in chapters if c['chapter_id'] == x), '')}",
+                    format_func=lambda x: f"Chapter {x}: {title_by_id.get(x, '')}",
                     key="mcq_chapter_selector"
                 )
                 
                 if selected_mcq_chapter_id:
                     # Display selected chapter info
-                    selected_chapter = next((c for c in chapters if c['chapter_id'] == selected_mcq_chapter_id), None)
+                    selected_chapter = chapter_by_id.get(selected_mcq_chapter_id)
                     if selected_chapter:
                         st.info(f"**Selected Chapter:** {selected_chapter['chapter_title']}")
                     
-                    # Action buttons
-                    col1, col2, col3 = st.columns([2, 1, 1])
-                    with col1:
-                        st.write("**Actions:**")
-                    with col2:
-                        if st.button("➕ Create Test MCQs", key=f"create_test_mcqs_{selected_mcq_chapter_id}"):
-                            with st.spinner("Creating test MCQs..."):
-                                success, message = create_test_mcqs(selected_mcq_chapter_id, st.session_state.token)
-                                if success:
-                                    st.success(message)
-                                    st.rerun()
-                                else:
-                                    st.error(message)
-                    with col3:
-                        if st.button("🔄 Refresh MCQs", key=f"refresh_mcqs_{selected_mcq_chapter_id}"):
-                            st.rerun()
-                    
-                    # Fetch and display MCQs
-                    with st.spinner("Loading MCQs..."):
-                        mcqs = get_mcqs_for_chapter(selected_mcq_chapter_id, st.session_state.token)
-                    
-                    if mcqs:
-                        st.success(f"Found {len(mcqs)} MCQ(s) for Chapter {selected_mcq_chapter_id}")
-                        
-                        # Display existing MCQs
-                        st.markdown("---")
-                        st.subheader("📝 MCQs")
-                        
-                        for i, mcq in enumerate(mcqs, 1):
-                            with st.expander(f"MCQ {i}: {mcq['question'][:80]}...", expanded=False):
-                                # Display current MCQ data
-                                st.write(f"**Question:** {mcq['question']}")
-                                st.write(f"**Options:**")
-                                for j, option in enumerate(mcq['options'], 1):
-                                    if option == mcq.get('correct_answer'):
-                                        st.write(f"  {j}. {option} ✅ (Correct)")
-                                    else:
-                                        st.write(f"  {j}. {option}")
-                                
-                                if mcq.get('explanation'):
-                                    st.write(f"**Explanation:** {mcq['explanation']}")
-                                st.write(f"**Created:** {mcq.get('created_at', 'N/A')}")
-                                
-                                # Edit MCQ section
-                                st.markdown("---")
-                                st.subheader("✏️ Edit MCQ")
-                                
-                                with st.form(f"edit_mcq_{mcq.get('id', i)}"):
-                                    # Question
-                                    edited_question = st.text_area(
-                                        "Question",
-                                        value=mcq['question'],
-                                        height=100,
-                                        key=f"question_{mcq.get('id', i)}"
-                                    )
-                                    
-                                    # Options
-                                    st.write("**Options:**")
-                                    edited_options = []
-                                    for j, option in enumerate(mcq['options']):
-                                        edited_option = st.text_input(
-                                            f"Option {j+1}",
-                                            value=option,
-                                            key=f"option_{mcq.get('id', i)}_{j}"
-                                        )
-                                        edited_options.append(edited_option)
-                                    
-                                    # Correct Answer
-                                    correct_answer_key = mcq.get('correct_answer', '')
-                                    correct_answer_index = 0
-                                    if correct_answer_key in mcq['options']:
-                                        correct_answer_index = mcq['options'].index(correct_answer_key)
-                                    
-                                    correct_answer_option = st.selectbox(
-                                        "Correct Answer",
-                                        options=edited_options if all(edited_options) else ["Please fill all options first"],
-                                        index=correct_answer_index,
-                                        key=f"correct_{mcq.get('id', i)}"
-                                    )
-                                    
-                                    # Explanation
-                                    edited_explanation = st.text_area(
-                                        "Explanation (optional)",
-                                        value=mcq.get('explanation', ''),
-                                        height=80,
-                                        key=f"explanation_{mcq.get('id', i)}"
-                                    )
-                                    
-                                    # Update button
-                                    update_button = st.form_submit_button("Update MCQ")
-                                    
-                                    if update_button:
-                                        if edited_question and all(edited_options) and correct_answer_option != "Please fill all options first":
-                                            mcq_data = {
-                                                "question": edited_question,
-                                                "options": edited_options,
-                                                "correct_answer": correct_answer_option,
-                                                "explanation": edited_explanation
-                                            }
-                                            
-                                            success, message = update_mcq(
-                                                mcq.get('id'), 
-                                                selected_mcq_chapter_id, 
-                                                mcq_data, 
-                                                st.session_state.token
-                                            )
-                                            
-                                            if success:
-                                                st.success(message)
-                                                st.rerun()
-                                            else:
-                                                st.error(message)
-                                        else:
-                                            st.error("Please fill in all required fields (question and all options).")
-                    else:
-                        st.info("No MCQs found for this chapter. Use the 'Create Test MCQs' button to add sample questions.")
+                    mcq_editor(selected_mcq_chapter_id)
             else:
                 st.info("No chapters found. Please add some chapters first.")
 